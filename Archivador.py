@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Archivador de pagos PAGADO.
+Mueve los pagos en estado PAGADO (final e inmutable) desde el archivo de datos
+a archivos comprimidos por mes de pago, para que cada request sólo lea y reescriba
+los pagos REGISTRADO/FALLIDO. Los pagos archivados siguen disponibles por
+GET /payments/{payment_id} y GET /payments?incluir_archivados=true.
+
+Debe ejecutarse con la API detenida (por ejemplo en una ventana de mantenimiento)
+y sin otra ejecución del archivador en paralelo. Reescribe el archivo de datos
+completo sin bloqueos, así que una escritura de la API entre la lectura y el
+guardado se perdería.
+
+Uso:
+    python Archivador.py [--antiguedad-dias N]
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from utils import (
+    STATUS,
+    STATUS_PAGADO,
+    PAID_AT,
+    load_all_payments,
+    save_all_payments,
+    archive_payments,
+)
+
+
+def _es_archivable(data, limite: datetime) -> bool:
+    """Un pago es archivable si está PAGADO y se pagó antes del límite (o no tiene fecha)."""
+    if data.get(STATUS) != STATUS_PAGADO:
+        return False
+    paid_at = data.get(PAID_AT)
+    return paid_at is None or datetime.fromisoformat(paid_at) <= limite
+
+
+def archivar_pagados(antiguedad_dias: float = 0) -> int:
+    """
+    Archiva los pagos PAGADO con al menos `antiguedad_dias` de antigüedad.
+    Los pagos PAGADO guardados sin paid_at (anteriores a ese campo) se archivan siempre.
+
+    Returns:
+        int: Cantidad de pagos archivados
+    """
+    limite = datetime.now(timezone.utc) - timedelta(days=antiguedad_dias)
+    a_archivar = {
+        payment_id: data
+        for payment_id, data in load_all_payments().items()
+        if _es_archivable(data, limite)
+    }
+    if not a_archivar:
+        return 0
+
+    # Primero se escriben en el archivo y recién después se quitan del archivo caliente
+    archive_payments(a_archivar)
+
+    all_data = load_all_payments()
+    for payment_id in a_archivar:
+        if all_data.get(payment_id, {}).get(STATUS) == STATUS_PAGADO:
+            del all_data[payment_id]
+    save_all_payments(all_data)
+    return len(a_archivar)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archiva los pagos PAGADO fuera del archivo de datos")
+    parser.add_argument("--antiguedad-dias", type=float, default=0,
+                        help="Sólo archivar pagos con al menos esta antigüedad")
+    args = parser.parse_args()
+
+    cantidad = archivar_pagados(args.antiguedad_dias)
+    print(f"✓ {cantidad} pago(s) PAGADO archivados")
+
+
+if __name__ == "__main__":
+    main()
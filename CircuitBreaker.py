@@ -0,0 +1,89 @@
+import time
+
+CERRADO = "CERRADO"
+ABIERTO = "ABIERTO"
+SEMI_ABIERTO = "SEMI_ABIERTO"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker para las llamadas al gateway de pagos.
+    - CERRADO: las llamadas pasan; tras `umbral_fallos` fallos consecutivos se abre.
+    - ABIERTO: las llamadas se rechazan sin contactar al gateway durante `tiempo_apertura_s`.
+    - SEMI_ABIERTO: se deja pasar una única llamada de prueba; si tiene éxito
+      el circuito se cierra, si falla vuelve a abrirse.
+    Cada cambio de estado incrementa la generación del circuito. Las llamadas
+    registran su resultado con la generación en la que fueron admitidas, y los
+    resultados de una generación anterior se ignoran. Así, una llamada lenta que
+    empezó con el circuito CERRADO no puede cerrarlo durante la apertura, ni
+    reabrirlo en SEMI_ABIERTO sin ser la llamada de prueba.
+    """
+
+    def __init__(self, umbral_fallos: int = 5, tiempo_apertura_s: float = 30.0, reloj=time.monotonic):
+        """
+        Args:
+            umbral_fallos: Fallos consecutivos necesarios para abrir el circuito
+            tiempo_apertura_s: Tiempo que el circuito permanece abierto antes de probar de nuevo
+            reloj: Función que retorna el tiempo actual en segundos (inyectable para tests)
+        """
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura_s = tiempo_apertura_s
+        self._reloj = reloj
+        self._estado = CERRADO
+        self._generacion = 0
+        self._fallos_consecutivos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+
+    def _transicionar(self, estado: str):
+        self._estado = estado
+        self._generacion += 1
+        self._prueba_en_curso = False
+
+    def get_estado(self) -> str:
+        """Retorna el estado actual del circuito, pasando a SEMI_ABIERTO si venció la apertura."""
+        if self._estado == ABIERTO and self._reloj() - self._abierto_desde >= self.tiempo_apertura_s:
+            self._transicionar(SEMI_ABIERTO)
+        return self._estado
+
+    @property
+    def generacion(self) -> int:
+        """Generación actual del circuito; se lee al admitir una llamada y se pasa a registrar_*."""
+        self.get_estado()
+        return self._generacion
+
+    def permitir(self) -> bool:
+        """
+        Indica si una llamada puede realizarse. En SEMI_ABIERTO sólo autoriza
+        la primera llamada hasta que se registre su resultado.
+        """
+        estado = self.get_estado()
+        if estado == CERRADO:
+            return True
+        if estado == SEMI_ABIERTO and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            return True
+        return False
+
+    def registrar_exito(self, generacion: int):
+        """Registra una llamada exitosa admitida en `generacion` y cierra el circuito."""
+        if generacion != self._generacion:
+            return
+        self._fallos_consecutivos = 0
+        if self._estado != CERRADO:
+            self._transicionar(CERRADO)
+
+    def registrar_fallo(self, generacion: int):
+        """Registra una llamada fallida admitida en `generacion` y abre el circuito si corresponde."""
+        if generacion != self._generacion:
+            return
+        self._fallos_consecutivos += 1
+        if self._estado == SEMI_ABIERTO or self._fallos_consecutivos >= self.umbral_fallos:
+            self._transicionar(ABIERTO)
+            self._abierto_desde = self._reloj()
+
+    def liberar(self, generacion: int):
+        """Libera la llamada de prueba sin registrar resultado (p. ej. si no llegó al gateway)."""
+        if generacion != self._generacion:
+            return
+        self._prueba_en_curso = False
@@ -24,6 +24,20 @@ class EstadoPago(ABC):
         """
         pass
     
+    async def pagar_async(self, pago: 'Pago') -> bool:
+        """
+        Variante asíncrona de pagar, usada por los endpoints de la API.
+        Por defecto delega en pagar; los estados que consultan al gateway
+        deben sobreescribirla para no bloquear el event loop.
+        
+        Args:
+            pago: El objeto pago que cambiará de estado
+            
+        Returns:
+            bool: True si el pago fue exitoso, False si falló
+        """
+        return self.pagar(pago)
+    
     @abstractmethod
     def revertir(self, pago: 'Pago') -> bool:
         """
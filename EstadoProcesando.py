@@ -0,0 +1,77 @@
+from EstadoPago import EstadoPago
+from GatewayPago import get_gateway
+from typing import TYPE_CHECKING
+from utils import PROCESSING_SINCE
+from datetime import datetime, timezone
+
+if TYPE_CHECKING:
+    from Pago import Pago
+
+# Vigencia de la marca PROCESANDO si el gateway no acota sus llamadas
+PLAZO_RECLAMO_DEFAULT_S = 60.0
+# Margen sobre el deadline del gateway, para que la llamada original ya haya terminado
+MARGEN_RECLAMO_S = 1.0
+
+
+class EstadoProcesando(EstadoPago):
+    """
+    Estado PROCESANDO - El pago está esperando la autorización del gateway.
+    Se registra antes de esperar al gateway para que otro request no procese
+    ni modifique el mismo pago mientras tanto.
+    Permite: revertir (vuelve a REGISTRADO) sólo cuando la marca venció, es decir
+    cuando ya pasó el deadline del gateway (p. ej. si el proceso se reinició durante la espera)
+    No permite: pagar, actualizar
+    """
+    def __init__(self, pago):
+        self.pago = pago
+
+    def pagar(self, pago: 'Pago') -> bool:
+        """
+        No se puede procesar un pago que ya se está procesando.
+        """
+        print(f"✗ Error: El pago {pago.id} ya se está procesando. No se puede procesar nuevamente.")
+        return False
+
+    def revertir(self, pago: 'Pago') -> bool:
+        """
+        No se puede revertir un pago mientras el gateway lo está autorizando.
+        Si la marca PROCESANDO es más vieja que el deadline del gateway, la autorización
+        ya no está en curso y el pago vuelve a REGISTRADO para un nuevo intento.
+        """
+        restante = self._segundos_para_vencer(pago)
+        if restante > 0:
+            print(f"✗ Error: No se puede revertir el pago {pago.id} porque se está procesando.")
+            print(f"  Si la autorización no termina, podrá revertirse en {restante:.0f}s.")
+            return False
+        
+        print(f"↺ Revirtiendo pago {pago.id}: la marca PROCESANDO venció sin respuesta del gateway...")
+        from EstadoRegistrado import EstadoRegistrado
+        pago.data.pop(PROCESSING_SINCE, None)
+        pago._cambiar_estado(EstadoRegistrado(pago))
+        print(f"✓ Pago {pago.id} revertido a REGISTRADO. Ahora puede ser procesado nuevamente.")
+        return True
+
+    def actualizar(self, pago: 'Pago', nuevo_monto: float = None, nuevo_metodo: str = None) -> bool:
+        """
+        No se pueden actualizar los datos de un pago mientras se autoriza,
+        ya que el gateway está autorizando el monto y método actuales.
+        """
+        print(f"✗ Error: No se puede actualizar el pago {pago.id} porque se está procesando.")
+        return False
+
+    def _segundos_para_vencer(self, pago: 'Pago') -> float:
+        """
+        Retorna los segundos que faltan para que venza la marca PROCESANDO (0 si ya venció).
+        Una marca sin fecha se considera vencida.
+        """
+        desde = pago.data.get(PROCESSING_SINCE)
+        if desde is None:
+            return 0.0
+        plazo = get_gateway().get_deadline_s()
+        plazo = (plazo if plazo is not None else PLAZO_RECLAMO_DEFAULT_S) + MARGEN_RECLAMO_S
+        transcurrido = (datetime.now(timezone.utc) - datetime.fromisoformat(desde)).total_seconds()
+        return max(0.0, plazo - transcurrido)
+    
+    def get_nombre_estado(self) -> str:
+        """Retorna el nombre del estado."""
+        return "PROCESANDO"
@@ -1,8 +1,11 @@
 from EstadoPago import EstadoPago
 from EstadoPagado import EstadoPagado
 from EstadoFallido import EstadoFallido
+from EstadoProcesando import EstadoProcesando
+from GatewayPago import ErrorGateway, get_gateway
 from typing import TYPE_CHECKING
-from utils import STATUS, PAYMENT_METHOD, STATUS_REGISTRADO, DATA_PATH
+from utils import STATUS, PAYMENT_METHOD, PAID_AT, PROCESSING_SINCE, STATUS_REGISTRADO, STATUS_PROCESANDO, DATA_PATH
+from datetime import datetime, timezone
 import json
 
 if TYPE_CHECKING:
@@ -24,9 +27,65 @@ class EstadoRegistrado(EstadoPago):
         print(f"Procesando pago {pago.id} con método {pago.data['payment_method']}...")
         
         es_valido = self._validar_pago(pago.data['payment_method'], pago.data['amount'])
+        if es_valido:
+            es_valido = self._autorizar_en_gateway(pago)
+        
+        return self._finalizar_pago(pago, es_valido)
+    
+    async def pagar_async(self, pago: 'Pago') -> bool:
+        """
+        Igual que pagar, pero espera la autorización del gateway sin bloquear el event loop.
+        Mientras se espera, otros requests pueden ejecutarse: el pago se marca PROCESANDO
+        antes de la espera y se vuelve a leer después, para no autorizarlo dos veces
+        ni pisar cambios con datos viejos.
+        """
+        # El pago pudo cambiar desde que se cargó; se delega en su estado actual
+        pago.recargar()
+        if pago.get_estado() != STATUS_REGISTRADO:
+            return await pago._estado.pagar_async(pago)
+        
+        print(f"Procesando pago {pago.id} con método {pago.data['payment_method']}...")
+        
+        es_valido = self._validar_pago(pago.data['payment_method'], pago.data['amount'])
+        if not es_valido:
+            return self._finalizar_pago(pago, False)
+        
+        # La fecha de la marca identifica este intento y permite revertirla si queda huérfana
+        reclamo = datetime.now(timezone.utc).isoformat()
+        pago.data[PROCESSING_SINCE] = reclamo
+        pago._cambiar_estado(EstadoProcesando(pago))
+        try:
+            es_valido = await self._autorizar_en_gateway_async(pago)
+        except BaseException:
+            # Cancelación u otro error inesperado: se libera el pago para un nuevo intento
+            pago.recargar()
+            if self._es_reclamo_vigente(pago, reclamo):
+                pago.data.pop(PROCESSING_SINCE, None)
+                pago._cambiar_estado(EstadoRegistrado(pago))
+            raise
         
+        pago.recargar()
+        if not self._es_reclamo_vigente(pago, reclamo):
+            print(f"✗ El pago {pago.id} cambió de estado mientras se procesaba; se descarta la respuesta del gateway")
+            return False
+        return self._finalizar_pago(pago, es_valido)
+    
+    def _es_reclamo_vigente(self, pago: 'Pago', reclamo: str) -> bool:
+        """
+        Indica si el pago sigue PROCESANDO por este mismo intento (y no fue revertido
+        y vuelto a reclamar por otro request).
+        """
+        return pago.get_estado() == STATUS_PROCESANDO and pago.data.get(PROCESSING_SINCE) == reclamo
+    
+    def _finalizar_pago(self, pago: 'Pago', es_valido: bool) -> bool:
+        """
+        Cambia el pago al estado PAGADO o FALLIDO según el resultado del procesamiento.
+        """
+        pago.data.pop(PROCESSING_SINCE, None)
         if es_valido:
             print(f"✓ Pago {pago.id} procesado exitosamente")
+            # La fecha de pago define la partición en la que se archivará
+            pago.data[PAID_AT] = datetime.now(timezone.utc).isoformat()
             pago._cambiar_estado(EstadoPagado(pago))
             return True
         else:
@@ -110,6 +169,39 @@ class EstadoRegistrado(EstadoPago):
             print(f"✗ Método de pago '{metodo_pago}' no reconocido")
             return False
     
+    def _autorizar_en_gateway(self, pago: 'Pago') -> bool:
+        """
+        Solicita la autorización del pago al gateway configurado.
+        Un error de comunicación con el gateway se trata como pago no autorizado.
+        
+        Returns:
+            bool: True si el gateway aprobó el pago, False en caso contrario
+        """
+        try:
+            autorizado = get_gateway().autorizar(pago.id, pago.data['payment_method'], pago.data['amount'])
+        except ErrorGateway as e:
+            print(f"✗ Error de comunicación con el gateway: {e}")
+            return False
+        
+        if not autorizado:
+            print(f"✗ El gateway rechazó el pago {pago.id}")
+        return autorizado
+    
+    async def _autorizar_en_gateway_async(self, pago: 'Pago') -> bool:
+        """
+        Variante asíncrona de _autorizar_en_gateway.
+        Timeouts, límites de concurrencia y circuito abierto llegan como ErrorGateway.
+        """
+        try:
+            autorizado = await get_gateway().autorizar_async(pago.id, pago.data['payment_method'], pago.data['amount'])
+        except ErrorGateway as e:
+            print(f"✗ Error de comunicación con el gateway: {e}")
+            return False
+        
+        if not autorizado:
+            print(f"✗ El gateway rechazó el pago {pago.id}")
+        return autorizado
+    
     def _contar_pagos_registrados_por_metodo(self, metodo_pago: str) -> int:
         """
         Cuenta cuántos pagos están en estado REGISTRADO con el método de pago especificado.
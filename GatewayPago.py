@@ -0,0 +1,233 @@
+import asyncio
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class ErrorGateway(Exception):
+    """
+    Error de comunicación con el gateway de pagos (timeout, caída, respuesta inválida).
+    Se distingue de un rechazo: el gateway no llegó a decidir sobre el pago.
+    """
+    pass
+
+
+class GatewayPago(ABC):
+    """
+    Interfaz abstracta del gateway externo que autoriza los pagos.
+    Se invoca en la transición REGISTRADO → PAGADO, luego de las validaciones locales.
+    """
+
+    @abstractmethod
+    def autorizar(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        """
+        Solicita al gateway la autorización del pago.
+
+        Args:
+            pago_id: Identificador del pago
+            metodo_pago: Método de pago seleccionado
+            monto: Monto del pago
+
+        Returns:
+            bool: True si el gateway aprobó el pago, False si lo rechazó
+
+        Raises:
+            ErrorGateway: Si no se pudo obtener una respuesta del gateway
+        """
+        pass
+
+    async def autorizar_async(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        """
+        Variante asíncrona de autorizar, usada por los endpoints de la API.
+        Por defecto ejecuta autorizar en un hilo aparte para no bloquear el event loop;
+        los gateways con I/O asíncrono nativo deben sobreescribirla.
+        """
+        return await asyncio.to_thread(self.autorizar, pago_id, metodo_pago, monto)
+
+    async def cerrar(self):
+        """Libera los recursos del gateway (conexiones abiertas). Por defecto no hace nada."""
+        pass
+
+    def get_deadline_s(self) -> float:
+        """
+        Tiempo máximo en segundos que puede demorar una autorización asíncrona.
+        Por defecto None: el gateway no acota la duración de sus llamadas.
+        """
+        return None
+
+
+class GatewayAprobador(GatewayPago):
+    """
+    Gateway por defecto: aprueba todo pago que pasó las validaciones locales.
+    Mantiene el comportamiento original cuando no hay un gateway configurado.
+    """
+
+    def autorizar(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        return True
+
+    async def autorizar_async(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        return True
+
+
+class GatewaySimulado(GatewayPago):
+    """
+    Gateway local que simula la latencia y los errores de un autorizador externo.
+    Pensado para pruebas de carga: la latencia sigue una distribución log-normal
+    (cola larga, como en un servicio real) y los fallos se sortean por pago.
+    """
+
+    def __init__(self, latencia_ms: float = 100.0, dispersion: float = 0.5,
+                 tasa_rechazo: float = 0.0, tasa_error: float = 0.0, semilla: int = None):
+        """
+        Args:
+            latencia_ms: Mediana de la latencia simulada en milisegundos
+            dispersion: Desvío del logaritmo de la latencia (0 = latencia constante)
+            tasa_rechazo: Probabilidad de que el gateway rechace el pago
+            tasa_error: Probabilidad de que el gateway no responda (ErrorGateway)
+            semilla: Semilla del generador aleatorio, para corridas reproducibles
+        """
+        self.latencia_ms = latencia_ms
+        self.dispersion = dispersion
+        self.tasa_rechazo = tasa_rechazo
+        self.tasa_error = tasa_error
+        self._random = random.Random(semilla)
+
+    def _sortear_latencia(self) -> float:
+        """Retorna una latencia en segundos según la distribución configurada."""
+        if self.latencia_ms <= 0:
+            return 0.0
+        return self._random.lognormvariate(0, self.dispersion) * self.latencia_ms / 1000
+
+    def _sortear_resultado(self, pago_id: str) -> bool:
+        """Decide si el pago se aprueba, se rechaza o el gateway no responde."""
+        sorteo = self._random.random()
+        if sorteo < self.tasa_error:
+            raise ErrorGateway(f"El gateway simulado no respondió para el pago {pago_id}")
+        return sorteo >= self.tasa_error + self.tasa_rechazo
+
+    def autorizar(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        time.sleep(self._sortear_latencia())
+        return self._sortear_resultado(pago_id)
+
+    async def autorizar_async(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        await asyncio.sleep(self._sortear_latencia())
+        return self._sortear_resultado(pago_id)
+
+
+class GatewayHTTP(GatewayPago):
+    """
+    Gateway que autoriza contra un servicio HTTP externo.
+    Envía POST {url}/authorize con {"payment_id", "payment_method", "amount"}
+    y espera una respuesta JSON {"approved": bool}.
+    Las llamadas asíncronas comparten un único pool de conexiones.
+    httpx se importa recién al usarlo, para que el resto del sistema (y los tests)
+    no dependan de él.
+    """
+
+    def __init__(self, url: str, max_conexiones: int = 100, timeout_s: float = 10.0):
+        """
+        Args:
+            url: URL base del autorizador
+            max_conexiones: Tamaño máximo del pool de conexiones compartido
+            timeout_s: Timeout de red por request (el deadline por pago lo aplica GatewayProtegido)
+        """
+        self.url = url.rstrip("/")
+        self.max_conexiones = max_conexiones
+        self.timeout_s = timeout_s
+        self._cliente: 'httpx.AsyncClient' = None
+
+    def _cuerpo(self, pago_id: str, metodo_pago: str, monto: float) -> dict:
+        return {"payment_id": pago_id, "payment_method": metodo_pago, "amount": monto}
+
+    def _interpretar(self, response: 'httpx.Response') -> bool:
+        """Traduce la respuesta del autorizador; cualquier respuesta inesperada es un ErrorGateway."""
+        if response.status_code >= 500:
+            raise ErrorGateway(f"El gateway respondió {response.status_code}")
+        try:
+            return bool(response.json()["approved"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ErrorGateway(f"Respuesta inválida del gateway: {e}")
+
+    def _get_cliente(self) -> 'httpx.AsyncClient':
+        """Retorna el cliente asíncrono compartido, creándolo en el primer uso."""
+        import httpx
+
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                base_url=self.url,
+                timeout=self.timeout_s,
+                limits=httpx.Limits(max_connections=self.max_conexiones,
+                                    max_keepalive_connections=self.max_conexiones),
+            )
+        return self._cliente
+
+    def autorizar(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        import httpx
+
+        try:
+            response = httpx.post(f"{self.url}/authorize", json=self._cuerpo(pago_id, metodo_pago, monto),
+                                  timeout=self.timeout_s)
+        except httpx.HTTPError as e:
+            raise ErrorGateway(f"No se pudo contactar al gateway: {e}")
+        return self._interpretar(response)
+
+    async def autorizar_async(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        import httpx
+
+        try:
+            response = await self._get_cliente().post("/authorize", json=self._cuerpo(pago_id, metodo_pago, monto))
+        except httpx.HTTPError as e:
+            raise ErrorGateway(f"No se pudo contactar al gateway: {e}")
+        return self._interpretar(response)
+
+    async def cerrar(self):
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+
+def gateway_desde_entorno() -> GatewayPago:
+    """
+    Construye el gateway según variables de entorno, para configurar el servidor
+    sin tocar código. GATEWAY puede ser "simulado" o "http"; si no se define
+    se usa el GatewayAprobador.
+
+    Variables: GATEWAY, GATEWAY_URL, GATEWAY_MAX_CONEXIONES, GATEWAY_LATENCIA_MS,
+    GATEWAY_DISPERSION, GATEWAY_TASA_RECHAZO, GATEWAY_TASA_ERROR, GATEWAY_SEMILLA.
+    """
+    tipo = os.environ.get("GATEWAY", "").lower()
+    if tipo == "http":
+        return GatewayHTTP(
+            url=os.environ["GATEWAY_URL"],
+            max_conexiones=int(os.environ.get("GATEWAY_MAX_CONEXIONES", 100)),
+        )
+    if tipo != "simulado":
+        return GatewayAprobador()
+
+    semilla = os.environ.get("GATEWAY_SEMILLA")
+    return GatewaySimulado(
+        latencia_ms=float(os.environ.get("GATEWAY_LATENCIA_MS", 100.0)),
+        dispersion=float(os.environ.get("GATEWAY_DISPERSION", 0.5)),
+        tasa_rechazo=float(os.environ.get("GATEWAY_TASA_RECHAZO", 0.0)),
+        tasa_error=float(os.environ.get("GATEWAY_TASA_ERROR", 0.0)),
+        semilla=int(semilla) if semilla is not None else None,
+    )
+
+
+_gateway: GatewayPago = GatewayAprobador()
+
+
+def get_gateway() -> GatewayPago:
+    """Retorna el gateway configurado actualmente."""
+    return _gateway
+
+
+def set_gateway(gateway: GatewayPago):
+    """Reemplaza el gateway utilizado por EstadoRegistrado al pagar."""
+    global _gateway
+    _gateway = gateway
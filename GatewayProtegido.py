@@ -0,0 +1,135 @@
+import asyncio
+import os
+
+from CircuitBreaker import CircuitBreaker
+from GatewayPago import GatewayPago, ErrorGateway
+
+
+class GatewayProtegido(GatewayPago):
+    """
+    Envuelve a otro gateway para que un autorizador lento o caído no agote el event loop:
+    - limita las llamadas concurrentes por método de pago,
+    - aplica un deadline por pago que incluye la espera por un lugar libre,
+    - corta las llamadas con un circuit breaker cuando el gateway está degradado.
+    Cualquiera de estos cortes se reporta como ErrorGateway, por lo que el pago queda FALLIDO.
+    Los límites y el circuito viven en memoria: valen por proceso, no entre workers.
+    """
+
+    def __init__(self, gateway: GatewayPago, timeout_s: float = 2.0, limite_concurrencia: int = 50,
+                 limites_por_metodo: dict = None, circuit_breaker: CircuitBreaker = None):
+        """
+        Args:
+            gateway: Gateway real al que se delega la autorización
+            timeout_s: Deadline total por autorización, en segundos
+            limite_concurrencia: Llamadas simultáneas permitidas para métodos sin límite propio
+            limites_por_metodo: Límite de llamadas simultáneas por método de pago
+            circuit_breaker: Circuit breaker a utilizar (por defecto uno nuevo)
+        """
+        self.gateway = gateway
+        self.timeout_s = timeout_s
+        self.limite_concurrencia = limite_concurrencia
+        self.limites_por_metodo = limites_por_metodo or {}
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._semaforos = {}
+
+    def _get_semaforo(self, metodo_pago: str) -> asyncio.Semaphore:
+        """Retorna el semáforo del método de pago, creándolo en el primer uso."""
+        if metodo_pago not in self._semaforos:
+            limite = self.limites_por_metodo.get(metodo_pago, self.limite_concurrencia)
+            self._semaforos[metodo_pago] = asyncio.Semaphore(limite)
+        return self._semaforos[metodo_pago]
+
+    def _verificar_circuito(self, pago_id: str) -> int:
+        """
+        Admite la llamada en el circuito o falla rápido si está abierto.
+
+        Returns:
+            int: Generación del circuito en la que se admitió la llamada
+        """
+        if not self.circuit_breaker.permitir():
+            raise ErrorGateway(f"Circuito abierto: el gateway está degradado, se rechaza el pago {pago_id}")
+        return self.circuit_breaker.generacion
+
+    def autorizar(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        generacion = self._verificar_circuito(pago_id)
+        try:
+            autorizado = self.gateway.autorizar(pago_id, metodo_pago, monto)
+        except ErrorGateway:
+            self.circuit_breaker.registrar_fallo(generacion)
+            raise
+        except BaseException:
+            # Error ajeno al gateway: no cuenta como fallo, pero libera la llamada de prueba
+            self.circuit_breaker.liberar(generacion)
+            raise
+        self.circuit_breaker.registrar_exito(generacion)
+        return autorizado
+
+    async def autorizar_async(self, pago_id: str, metodo_pago: str, monto: float) -> bool:
+        generacion = self._verificar_circuito(pago_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_s
+        semaforo = self._get_semaforo(metodo_pago)
+
+        # La espera por un lugar libre consume el mismo deadline: si el método está
+        # saturado se falla sin contactar al gateway ni penalizar al circuito.
+        try:
+            await asyncio.wait_for(semaforo.acquire(), timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.circuit_breaker.liberar(generacion)
+            raise ErrorGateway(f"Límite de concurrencia alcanzado para {metodo_pago}, se rechaza el pago {pago_id}")
+        except BaseException:
+            self.circuit_breaker.liberar(generacion)
+            raise
+
+        try:
+            autorizado = await asyncio.wait_for(
+                self.gateway.autorizar_async(pago_id, metodo_pago, monto),
+                timeout=max(0.0, deadline - loop.time()),
+            )
+        except asyncio.TimeoutError:
+            self.circuit_breaker.registrar_fallo(generacion)
+            raise ErrorGateway(f"Timeout de {self.timeout_s}s autorizando el pago {pago_id}")
+        except ErrorGateway:
+            self.circuit_breaker.registrar_fallo(generacion)
+            raise
+        except BaseException:
+            # Cancelación u otro error ajeno al gateway: no cuenta como fallo del circuito
+            self.circuit_breaker.liberar(generacion)
+            raise
+        finally:
+            semaforo.release()
+
+        self.circuit_breaker.registrar_exito(generacion)
+        return autorizado
+
+    async def cerrar(self):
+        await self.gateway.cerrar()
+
+    def get_deadline_s(self) -> float:
+        return self.timeout_s
+
+
+def gateway_protegido_desde_entorno(gateway: GatewayPago) -> GatewayProtegido:
+    """
+    Envuelve el gateway con las protecciones configuradas por variables de entorno.
+
+    Variables: GATEWAY_TIMEOUT_MS, GATEWAY_LIMITE_CONCURRENCIA,
+    GATEWAY_LIMITE_TARJETA_CREDITO, GATEWAY_LIMITE_PAYPAL,
+    GATEWAY_UMBRAL_FALLOS, GATEWAY_APERTURA_S.
+    """
+    limites_por_metodo = {}
+    for metodo in ("tarjeta_credito", "paypal"):
+        limite = os.environ.get(f"GATEWAY_LIMITE_{metodo.upper()}")
+        if limite is not None:
+            limites_por_metodo[metodo] = int(limite)
+
+    return GatewayProtegido(
+        gateway,
+        timeout_s=float(os.environ.get("GATEWAY_TIMEOUT_MS", 2000)) / 1000,
+        limite_concurrencia=int(os.environ.get("GATEWAY_LIMITE_CONCURRENCIA", 50)),
+        limites_por_metodo=limites_por_metodo,
+        circuit_breaker=CircuitBreaker(
+            umbral_fallos=int(os.environ.get("GATEWAY_UMBRAL_FALLOS", 5)),
+            tiempo_apertura_s=float(os.environ.get("GATEWAY_APERTURA_S", 30)),
+        ),
+    )
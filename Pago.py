@@ -2,15 +2,18 @@ from EstadoPago import EstadoPago
 from EstadoPagado import EstadoPagado
 from EstadoFallido import EstadoFallido
 from EstadoRegistrado import EstadoRegistrado
+from EstadoProcesando import EstadoProcesando
 from utils import (
     STATUS,
     STATUS_REGISTRADO,
     STATUS_PAGADO,
     STATUS_FALLIDO,
+    STATUS_PROCESANDO,
     AMOUNT,
     PAYMENT_METHOD,
     load_payment,
     load_all_payments,
+    load_archived_payment,
     save_payment_data,
 )
 
@@ -24,9 +27,15 @@ class Pago:
     def __init__(self, id, amount: float = None, payment_method: str = None):
         self.id = str(id)
         all_data = load_all_payments()
+        # Los pagos archivados (PAGADO) son de sólo lectura y no vuelven a DATA_PATH
+        self._archivado = False
+        archived_data = load_archived_payment(self.id) if self.id not in all_data else None
 
+        if archived_data is not None:
+            self.data = archived_data
+            self._archivado = True
         # Si el pago no existe todavía se crea en estado REGISTRADO
-        if self.id not in all_data:
+        elif self.id not in all_data:
             if amount is None or payment_method is None:
                 raise ValueError("Para crear un nuevo pago se requieren amount y payment_method.")
             self.data = {
@@ -38,13 +47,38 @@ class Pago:
         else:
             self.data = all_data[self.id]
 
+        self._estado: EstadoPago = self._crear_estado()
+
+    def _crear_estado(self) -> EstadoPago:
+        """
+        Crea el estado correspondiente al status guardado en los datos del pago.
+        """
         status = self.data.get(STATUS)
         if status == STATUS_PAGADO:
-            self._estado: EstadoPago = EstadoPagado(self)
+            return EstadoPagado(self)
         elif status == STATUS_FALLIDO:
-            self._estado: EstadoPago = EstadoFallido(self)
+            return EstadoFallido(self)
+        elif status == STATUS_PROCESANDO:
+            return EstadoProcesando(self)
         else:
-            self._estado: EstadoPago = EstadoRegistrado(self)
+            return EstadoRegistrado(self)
+
+    def recargar(self):
+        """
+        Vuelve a leer el pago desde el almacenamiento, descartando los datos en memoria.
+        Se usa al retomar un pago luego de esperar al gateway, ya que otro request
+        pudo modificarlo mientras tanto.
+        """
+        all_data = load_all_payments()
+        self._archivado = self.id not in all_data
+        if self._archivado:
+            archived_data = load_archived_payment(self.id)
+            if archived_data is None:
+                raise KeyError(self.id)
+            self.data = archived_data
+        else:
+            self.data = all_data[self.id]
+        self._estado = self._crear_estado()
 
     def get_estado(self):
         """
@@ -65,6 +99,10 @@ class Pago:
         self._estado.pagar(self)
         self.save()
 
+    async def pagar_async(self):
+        await self._estado.pagar_async(self)
+        self.save()
+
     def revertir(self):
         self._estado.revertir(self)
         self.save()
@@ -74,4 +112,6 @@ class Pago:
         self.save()
 
     def save(self):
+        if self._archivado:
+            return
         save_payment_data(self.id, self.data)
\ No newline at end of file
@@ -1,13 +1,39 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from Pago import Pago
-from utils import load_all_payments
+from GatewayPago import get_gateway, set_gateway, gateway_desde_entorno
+from GatewayProtegido import gateway_protegido_desde_entorno
+from utils import load_all_payments, load_all_archived_payments, load_payment
 
-app = FastAPI()
 
-# * GET en el path /payments que retorne todos los pagos.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Cerrar el pool de conexiones compartido con el gateway
+    await get_gateway().cerrar()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# El gateway de autorización se configura por variables de entorno
+# (ver GatewayPago.py y GatewayProtegido.py)
+set_gateway(gateway_protegido_desde_entorno(gateway_desde_entorno()))
+
+# * GET en el path /payments que retorne los pagos activos (y los archivados si se piden).
 @app.get("/payments")
-async def get_payments():
-    return load_all_payments()
+async def get_payments(incluir_archivados: bool = False):
+    pagos = load_all_archived_payments() if incluir_archivados else {}
+    pagos.update(load_all_payments())
+    return pagos
+
+
+# * GET en el path /payments/{payment_id} que retorne un pago, esté activo o archivado.
+@app.get("/payments/{payment_id}")
+async def get_payment(payment_id: str):
+    try:
+        return load_payment(payment_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Pago {payment_id} no encontrado.")
 
 
 # * POST en el path /payments/{payment_id} que registre un nuevo pago.
@@ -33,7 +59,7 @@ async def update_payment(payment_id: str, amount: float, payment_method: str):
 @app.post("/payments/{payment_id}/pay")
 async def pay_payment(payment_id: str):
     pago = Pago(payment_id)
-    pago.pagar()
+    await pago.pagar_async()
     return {
             "message": f"Pago {payment_id} procesado.",
             "estado": pago.get_estado(),
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Generador de carga para la API de pagos.
+Registra y paga pagos a una tasa objetivo (RPS) y reporta throughput,
+latencias de cola y tasas de fallo, para dimensionar timeouts y la capacidad
+de un worker.
+
+Cada flujo crea un pago nuevo, así que el servidor debe apuntar a un archivo
+de datos descartable (PAGOS_DATA_PATH) y no a data.json. Además debe correr con
+un único worker: los workers leen y reescriben el archivo de datos completo sin
+bloqueos, y con varios se pisan entre sí. En ese caso la tasa de error mediría
+esa carrera y no al gateway.
+
+Uso:
+    PAGOS_DATA_PATH=carga.json GATEWAY=simulado GATEWAY_LATENCIA_MS=200 python -m uvicorn main:app --workers 1
+    python prueba_carga.py --rps 50 --duracion 30 --concurrencia 64
+"""
+
+import argparse
+import json
+import math
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _post(url: str, timeout: float) -> dict:
+    """Envía un POST sin cuerpo y retorna la respuesta JSON."""
+    request = urllib.request.Request(url, data=b"", method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _flujo_pago(base_url: str, pago_id: str, monto: float, timeout: float, inicio_programado: float) -> dict:
+    """
+    Registra un pago con PayPal y lo paga.
+    La latencia se mide desde el instante programado (no desde el envío real),
+    para no ocultar la espera cuando el cliente se satura.
+    """
+    resultado = {"ok": False, "estado": None, "latencia": None, "latencia_pagar": None, "error": None}
+    try:
+        query = urllib.parse.urlencode({"amount": monto, "payment_method": "paypal"})
+        _post(f"{base_url}/payments/{pago_id}?{query}", timeout)
+
+        inicio_pagar = time.perf_counter()
+        respuesta = _post(f"{base_url}/payments/{pago_id}/pay", timeout)
+        fin = time.perf_counter()
+
+        resultado["ok"] = True
+        resultado["estado"] = respuesta.get("estado")
+        resultado["latencia_pagar"] = fin - inicio_pagar
+        resultado["latencia"] = fin - inicio_programado
+    except (urllib.error.URLError, TimeoutError, OSError, ValueError) as e:
+        resultado["error"] = type(e).__name__
+        resultado["latencia"] = time.perf_counter() - inicio_programado
+    return resultado
+
+
+def _percentil(valores: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+def ejecutar_carga(base_url: str, rps: float, duracion: float, concurrencia: int,
+                   monto: float = 100.0, timeout: float = 10.0) -> dict:
+    """
+    Dispara flujos de pago a tasa constante (carga de lazo abierto) durante `duracion` segundos.
+
+    Returns:
+        dict: Métricas agregadas de la corrida
+    """
+    prefijo = f"carga-{int(time.time())}"
+    total = int(rps * duracion)
+    intervalo = 1 / rps
+
+    futuros = []
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        for i in range(total):
+            programado = inicio + i * intervalo
+            espera = programado - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            futuros.append(executor.submit(_flujo_pago, base_url, f"{prefijo}-{i}", monto, timeout, programado))
+        resultados = [f.result() for f in futuros]
+    transcurrido = time.perf_counter() - inicio
+
+    exitosos = [r for r in resultados if r["ok"]]
+    latencias = sorted(r["latencia"] for r in exitosos)
+    latencias_pagar = sorted(r["latencia_pagar"] for r in exitosos)
+    errores = {}
+    for r in resultados:
+        if r["error"]:
+            errores[r["error"]] = errores.get(r["error"], 0) + 1
+
+    return {
+        "enviados": total,
+        "completados": len(exitosos),
+        "duracion_s": transcurrido,
+        "throughput_rps": len(exitosos) / transcurrido if transcurrido > 0 else 0.0,
+        "tasa_error_http": (total - len(exitosos)) / total if total else 0.0,
+        "tasa_fallido": sum(1 for r in exitosos if r["estado"] == "FALLIDO") / len(exitosos) if exitosos else 0.0,
+        "errores": errores,
+        "latencia_ms": {f"p{p}": _percentil(latencias, p) * 1000 for p in (50, 90, 99)},
+        "latencia_pagar_ms": {f"p{p}": _percentil(latencias_pagar, p) * 1000 for p in (50, 90, 99)},
+        "latencia_max_ms": latencias[-1] * 1000 if latencias else 0.0,
+    }
+
+
+def mostrar_reporte(metricas: dict):
+    """Imprime las métricas de la corrida en formato legible."""
+    print("=== REPORTE DE CARGA ===")
+    print(f"Enviados: {metricas['enviados']}  Completados: {metricas['completados']}  "
+          f"Duración: {metricas['duracion_s']:.1f}s")
+    print(f"Throughput: {metricas['throughput_rps']:.1f} flujos/s")
+    print(f"Tasa de error HTTP: {metricas['tasa_error_http']:.1%}  "
+          f"Pagos FALLIDOS: {metricas['tasa_fallido']:.1%}")
+    if metricas["errores"]:
+        print(f"Errores: {metricas['errores']}")
+    flujo = metricas["latencia_ms"]
+    pagar = metricas["latencia_pagar_ms"]
+    print(f"Latencia flujo (ms): p50={flujo['p50']:.1f} p90={flujo['p90']:.1f} "
+          f"p99={flujo['p99']:.1f} max={metricas['latencia_max_ms']:.1f}")
+    print(f"Latencia /pay (ms):  p50={pagar['p50']:.1f} p90={pagar['p90']:.1f} p99={pagar['p99']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de pagos")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base de la API")
+    parser.add_argument("--rps", type=float, default=10.0, help="Flujos de pago por segundo")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Duración de la prueba en segundos")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Máximo de flujos en vuelo")
+    parser.add_argument("--monto", type=float, default=100.0, help="Monto de cada pago")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Timeout por request en segundos")
+    args = parser.parse_args()
+
+    metricas = ejecutar_carga(args.url.rstrip("/"), args.rps, args.duracion,
+                              args.concurrencia, args.monto, args.timeout)
+    mostrar_reporte(metricas)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
 import unittest
 import os
 import json
+import asyncio
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
 from Pago import Pago
+from Archivador import archivar_pagados
+from prueba_carga import _percentil
+from GatewayPago import GatewayPago, GatewaySimulado, ErrorGateway, get_gateway, set_gateway
+from GatewayProtegido import GatewayProtegido
+from CircuitBreaker import CircuitBreaker
 import utils as PagoModule
 
 
@@ -106,5 +115,321 @@ class TestPagoState(unittest.TestCase):
         self.assertEqual(pago.get_estado(), "PAGADO")
 
 
+class EntornoDePrueba:
+    """Mixin que aísla los datos, el archivo y el gateway de cada test en un directorio temporal."""
+
+    def setUp(self):
+        # Guardar configuración original para restaurar después
+        self._orig_data_path = PagoModule.DATA_PATH
+        self._orig_archive_dir = PagoModule.ARCHIVE_DIR
+        self._orig_gateway = get_gateway()
+
+        # Inicializar archivo de tests vacío
+        self.test_dir = tempfile.mkdtemp()
+        PagoModule.DATA_PATH = os.path.join(self.test_dir, "data_tests.json")
+        PagoModule.ARCHIVE_DIR = os.path.join(self.test_dir, "archivo")
+        with open(PagoModule.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump({}, f)
+
+    def tearDown(self):
+        PagoModule.DATA_PATH = self._orig_data_path
+        PagoModule.ARCHIVE_DIR = self._orig_archive_dir
+        set_gateway(self._orig_gateway)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class GatewayRechazador(GatewayPago):
+    def autorizar(self, pago_id, metodo_pago, monto):
+        return False
+
+
+class GatewayCaido(GatewayPago):
+    def autorizar(self, pago_id, metodo_pago, monto):
+        raise ErrorGateway("sin respuesta")
+
+
+class GatewayContador(GatewayPago):
+    def __init__(self):
+        self.llamadas = 0
+
+    def autorizar(self, pago_id, metodo_pago, monto):
+        self.llamadas += 1
+        return True
+
+
+class TestGatewayPago(EntornoDePrueba, unittest.TestCase):
+    def test_gateway_rechaza_pago_queda_fallido(self):
+        """Si el gateway rechaza el pago, debe quedar FALLIDO aunque pase las validaciones locales."""
+        set_gateway(GatewayRechazador())
+        pago = Pago("G1", 100.0, "paypal")
+        pago.pagar()
+        self.assertEqual(pago.get_estado(), "FALLIDO")
+
+    def test_gateway_caido_pago_queda_fallido(self):
+        """Un error de comunicación con el gateway debe dejar el pago FALLIDO."""
+        set_gateway(GatewayCaido())
+        pago = Pago("G2", 100.0, "paypal")
+        pago.pagar()
+        self.assertEqual(pago.get_estado(), "FALLIDO")
+
+    def test_gateway_no_se_invoca_si_falla_validacion(self):
+        """Un pago que no pasa las validaciones locales no debe llegar al gateway."""
+        gateway = GatewayContador()
+        set_gateway(gateway)
+        pago = Pago("G3", 6000.0, "paypal")
+        pago.pagar()
+        self.assertEqual(pago.get_estado(), "FALLIDO")
+        self.assertEqual(gateway.llamadas, 0)
+
+    def test_gateway_simulado_tasas(self):
+        """El gateway simulado respeta las tasas extremas de rechazo y error."""
+        self.assertTrue(GatewaySimulado(latencia_ms=0).autorizar("S1", "paypal", 100.0))
+        self.assertFalse(GatewaySimulado(latencia_ms=0, tasa_rechazo=1.0).autorizar("S2", "paypal", 100.0))
+        with self.assertRaises(ErrorGateway):
+            GatewaySimulado(latencia_ms=0, tasa_error=1.0).autorizar("S3", "paypal", 100.0)
+
+
+class TestPercentil(unittest.TestCase):
+    def test_rango_mas_cercano(self):
+        """El percentil usa el rango más cercano (redondeo hacia arriba), sin subestimar la cola."""
+        self.assertEqual(_percentil([1, 2, 3, 4, 5], 50), 3)
+        valores = list(range(1, 26))
+        self.assertEqual(_percentil(valores, 90), 23)
+        self.assertEqual(_percentil(valores, 99), 25)
+        self.assertEqual(_percentil([7], 50), 7)
+        self.assertEqual(_percentil([], 99), 0.0)
+
+
+class GatewayLento(GatewayPago):
+    """Gateway que demora `demora_s` en aprobar y registra la concurrencia máxima observada."""
+    def __init__(self, demora_s):
+        self.demora_s = demora_s
+        self.llamadas = 0
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def autorizar(self, pago_id, metodo_pago, monto):
+        return True
+
+    async def autorizar_async(self, pago_id, metodo_pago, monto):
+        self.llamadas += 1
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            await asyncio.sleep(self.demora_s)
+        finally:
+            self.en_vuelo -= 1
+        return True
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.ahora = 0.0
+        self.breaker = CircuitBreaker(umbral_fallos=2, tiempo_apertura_s=10, reloj=lambda: self.ahora)
+
+    def _admitir(self):
+        """Admite una llamada y retorna la generación en la que fue admitida."""
+        self.assertTrue(self.breaker.permitir())
+        return self.breaker.generacion
+
+    def _abrir(self):
+        for _ in range(2):
+            self.breaker.registrar_fallo(self._admitir())
+
+    def test_abre_tras_fallos_consecutivos(self):
+        """El circuito se abre al alcanzar el umbral de fallos consecutivos."""
+        self.breaker.registrar_fallo(self._admitir())
+        self.assertTrue(self.breaker.permitir())
+        self.breaker.registrar_fallo(self.breaker.generacion)
+        self.assertEqual(self.breaker.get_estado(), "ABIERTO")
+        self.assertFalse(self.breaker.permitir())
+
+    def test_semi_abierto_permite_una_prueba(self):
+        """Vencida la apertura se permite una única llamada de prueba; si tiene éxito se cierra."""
+        self._abrir()
+        self.ahora = 10
+        prueba = self._admitir()
+        self.assertFalse(self.breaker.permitir())
+        self.breaker.registrar_exito(prueba)
+        self.assertEqual(self.breaker.get_estado(), "CERRADO")
+
+    def test_semi_abierto_vuelve_a_abrir_si_falla(self):
+        """Si la llamada de prueba falla, el circuito vuelve a abrirse."""
+        self._abrir()
+        self.ahora = 10
+        self.breaker.registrar_fallo(self._admitir())
+        self.assertEqual(self.breaker.get_estado(), "ABIERTO")
+
+    def test_exito_tardio_no_cierra_circuito_abierto(self):
+        """Una llamada admitida antes de la apertura no cierra el circuito al terminar."""
+        vieja = self._admitir()
+        self._abrir()
+        self.breaker.registrar_exito(vieja)
+        self.assertEqual(self.breaker.get_estado(), "ABIERTO")
+
+    def test_fallo_tardio_no_reabre_semi_abierto(self):
+        """Un fallo de una llamada previa a la apertura no afecta a la llamada de prueba."""
+        vieja = self._admitir()
+        self._abrir()
+        self.ahora = 10
+        prueba = self._admitir()
+        self.breaker.registrar_fallo(vieja)
+        self.assertEqual(self.breaker.get_estado(), "SEMI_ABIERTO")
+        self.breaker.registrar_exito(prueba)
+        self.assertEqual(self.breaker.get_estado(), "CERRADO")
+
+
+class GatewayRoto(GatewayPago):
+    def autorizar(self, pago_id, metodo_pago, monto):
+        raise RuntimeError("bug en el gateway")
+
+
+class TestGatewayProtegido(unittest.TestCase):
+    def test_error_inesperado_libera_llamada_de_prueba(self):
+        """Una excepción ajena al gateway en la llamada de prueba no deja el circuito bloqueado."""
+        ahora = [0.0]
+        breaker = CircuitBreaker(umbral_fallos=1, tiempo_apertura_s=10, reloj=lambda: ahora[0])
+        protegido = GatewayProtegido(GatewayRoto(), circuit_breaker=breaker)
+        breaker.permitir()
+        breaker.registrar_fallo(breaker.generacion)
+        ahora[0] = 10
+
+        with self.assertRaises(RuntimeError):
+            protegido.autorizar("E1", "paypal", 100.0)
+        self.assertEqual(breaker.get_estado(), "SEMI_ABIERTO")
+        self.assertTrue(breaker.permitir())
+
+
+class TestPagarAsync(EntornoDePrueba, unittest.IsolatedAsyncioTestCase):
+    async def test_pagar_async_exitoso(self):
+        """pagar_async con un gateway que aprueba deja el pago PAGADO."""
+        set_gateway(GatewayProtegido(GatewayLento(0)))
+        pago = Pago("A1", 100.0, "paypal")
+        await pago.pagar_async()
+        self.assertEqual(pago.get_estado(), "PAGADO")
+
+    async def test_timeout_deja_pago_fallido(self):
+        """Si el gateway no responde antes del deadline, el pago queda FALLIDO."""
+        set_gateway(GatewayProtegido(GatewayLento(1), timeout_s=0.05))
+        pago = Pago("A2", 100.0, "paypal")
+        await pago.pagar_async()
+        self.assertEqual(pago.get_estado(), "FALLIDO")
+
+    async def test_circuito_abierto_falla_sin_llamar_al_gateway(self):
+        """Con el circuito abierto el pago falla rápido sin contactar al gateway."""
+        lento = GatewayLento(1)
+        set_gateway(GatewayProtegido(lento, timeout_s=0.05,
+                                     circuit_breaker=CircuitBreaker(umbral_fallos=1, tiempo_apertura_s=60)))
+        primero = Pago("A3", 100.0, "paypal")
+        await primero.pagar_async()
+        self.assertEqual(lento.llamadas, 1)
+
+        segundo = Pago("A4", 100.0, "paypal")
+        await segundo.pagar_async()
+        self.assertEqual(segundo.get_estado(), "FALLIDO")
+        self.assertEqual(lento.llamadas, 1)
+
+    async def test_pagos_concurrentes_autorizan_una_sola_vez(self):
+        """Dos pagar_async simultáneos sobre el mismo pago llaman una sola vez al gateway."""
+        lento = GatewayLento(0.05)
+        set_gateway(lento)
+        primero = Pago("R1", 100.0, "paypal")
+        segundo = Pago("R1")
+        await asyncio.gather(primero.pagar_async(), segundo.pagar_async())
+        self.assertEqual(lento.llamadas, 1)
+        self.assertEqual(Pago("R1").get_estado(), "PAGADO")
+
+    async def test_actualizar_durante_procesamiento_es_rechazado(self):
+        """Mientras el gateway autoriza, el pago queda PROCESANDO y no acepta cambios."""
+        set_gateway(GatewayLento(0.05))
+        pago = Pago("R2", 100.0, "paypal")
+        pago_en_curso = asyncio.create_task(pago.pagar_async())
+        await asyncio.sleep(0.01)
+
+        otro = Pago("R2")
+        self.assertEqual(otro.get_estado(), "PROCESANDO")
+        otro.actualizar(amount=50.0)
+
+        await pago_en_curso
+        final = Pago("R2")
+        self.assertEqual(final.get_estado(), "PAGADO")
+        self.assertEqual(final.data["amount"], 100.0)
+
+    def _guardar_procesando(self, pago_id, hace_s):
+        desde = (datetime.now(timezone.utc) - timedelta(seconds=hace_s)).isoformat()
+        PagoModule.save_payment_data(pago_id, {
+            "amount": 100.0, "payment_method": "paypal",
+            "status": "PROCESANDO", "processing_since": desde,
+        })
+
+    async def test_reclamo_vencido_se_puede_revertir(self):
+        """Una marca PROCESANDO más vieja que el deadline (p. ej. tras un reinicio) se revierte a REGISTRADO."""
+        set_gateway(GatewayProtegido(GatewayLento(0), timeout_s=2))
+        self._guardar_procesando("V1", hace_s=60)
+        pago = Pago("V1")
+        pago.revertir()
+        self.assertEqual(pago.get_estado(), "REGISTRADO")
+        self.assertNotIn("processing_since", Pago("V1").data)
+
+        await pago.pagar_async()
+        self.assertEqual(pago.get_estado(), "PAGADO")
+
+    async def test_reclamo_vigente_no_se_revierte(self):
+        """Mientras no venza el deadline, un pago PROCESANDO no puede revertirse."""
+        set_gateway(GatewayProtegido(GatewayLento(0), timeout_s=2))
+        self._guardar_procesando("V2", hace_s=0)
+        pago = Pago("V2")
+        pago.revertir()
+        self.assertEqual(Pago("V2").get_estado(), "PROCESANDO")
+
+    async def test_limite_concurrencia_por_metodo(self):
+        """El gateway nunca recibe más llamadas simultáneas que el límite del método."""
+        lento = GatewayLento(0.02)
+        protegido = GatewayProtegido(lento, timeout_s=5, limites_por_metodo={"paypal": 2})
+        resultados = await asyncio.gather(*[
+            protegido.autorizar_async(f"C{i}", "paypal", 100.0) for i in range(6)
+        ])
+        self.assertTrue(all(resultados))
+        self.assertEqual(lento.max_en_vuelo, 2)
+
+
+class TestArchivador(EntornoDePrueba, unittest.TestCase):
+    def test_archiva_solo_pagados(self):
+        """Sólo los pagos PAGADO salen del archivo de datos, a su partición mensual comprimida."""
+        pagado = Pago("AR1", 100.0, "paypal")
+        pagado.pagar()
+        fallido = Pago("AR2", 6000.0, "paypal")
+        fallido.pagar()
+        Pago("AR3", 100.0, "paypal")
+
+        self.assertEqual(archivar_pagados(), 1)
+
+        self.assertEqual(set(PagoModule.load_all_payments()), {"AR2", "AR3"})
+        particion = PagoModule.archive_partition(pagado.data)
+        self.assertTrue(os.path.exists(os.path.join(PagoModule.ARCHIVE_DIR, f"{particion}.json.gz")))
+        self.assertEqual(PagoModule.load_payment("AR1")["status"], "PAGADO")
+
+    def test_pago_archivado_se_lee_y_no_vuelve_al_archivo_caliente(self):
+        """Un pago archivado se carga como PAGADO y operar sobre él no lo reescribe en DATA_PATH."""
+        Pago("AR4", 100.0, "paypal").pagar()
+        archivar_pagados()
+
+        pago = Pago("AR4")
+        self.assertEqual(pago.get_estado(), "PAGADO")
+        pago.pagar()
+        pago.revertir()
+        self.assertNotIn("AR4", PagoModule.load_all_payments())
+
+        # Registrar otro pago con el mismo id no debe pisar al archivado
+        repetido = Pago("AR4", 999.0, "paypal")
+        self.assertEqual(repetido.data["amount"], 100.0)
+
+    def test_respeta_antiguedad(self):
+        """Los pagos más recientes que la antigüedad pedida quedan en el archivo de datos."""
+        Pago("AR5", 100.0, "paypal").pagar()
+        self.assertEqual(archivar_pagados(antiguedad_dias=1), 0)
+        self.assertIn("AR5", PagoModule.load_all_payments())
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,14 +1,27 @@
+import gzip
 import json
+import os
+import tempfile
 
 STATUS = "status"
 AMOUNT = "amount"
 PAYMENT_METHOD = "payment_method"
+PAID_AT = "paid_at"
+PROCESSING_SINCE = "processing_since"
 
 STATUS_REGISTRADO = "REGISTRADO"
 STATUS_PAGADO = "PAGADO"
 STATUS_FALLIDO = "FALLIDO"
+STATUS_PROCESANDO = "PROCESANDO"
 
-DATA_PATH = "data.json"
+# Archivo de pagos activos; PAGOS_DATA_PATH permite usar otro (p. ej. para pruebas de carga)
+DATA_PATH = os.environ.get("PAGOS_DATA_PATH", "data.json")
+
+# Los pagos PAGADO archivados se guardan fuera de DATA_PATH, en un archivo
+# comprimido por mes de pago (ARCHIVE_DIR/AAAA-MM.json.gz) más un índice id → partición.
+ARCHIVE_DIR = "archivo"
+ARCHIVE_INDEX = "indice.json"
+ARCHIVE_SIN_FECHA = "sin-fecha"
 
 def load_all_payments():
     try:
@@ -33,7 +46,12 @@ def save_all_payments(data):
 
 
 def load_payment(payment_id):
-    data = load_all_payments()[payment_id]
+    all_data = load_all_payments()
+    if payment_id in all_data:
+        return all_data[payment_id]
+    data = load_archived_payment(payment_id)
+    if data is None:
+        raise KeyError(payment_id)
     return data
 
 
@@ -49,4 +67,90 @@ def save_payment(payment_id, amount, payment_method, status):
         PAYMENT_METHOD: payment_method,
         STATUS: status,
     }
-    save_payment_data(payment_id, data)
\ No newline at end of file
+    save_payment_data(payment_id, data)
+
+
+def _write_atomic(path, content: bytes):
+    """Escribe el archivo completo en un temporal único y lo reemplaza, para no dejarlo a medias."""
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", delete=False) as f:
+        f.write(content)
+    os.replace(f.name, path)
+
+
+def archive_partition(data):
+    """Retorna la partición (AAAA-MM) de un pago según su fecha de pago."""
+    paid_at = data.get(PAID_AT)
+    return paid_at[:7] if paid_at else ARCHIVE_SIN_FECHA
+
+
+def _archive_partition_path(partition):
+    return os.path.join(ARCHIVE_DIR, f"{partition}.json.gz")
+
+
+_archive_index_cache = {"key": None, "data": {}}
+
+
+def load_archive_index():
+    """
+    Retorna el índice id → partición de los pagos archivados.
+    Se cachea mientras el archivo no cambie, ya que se consulta en cada pago nuevo.
+    """
+    path = os.path.join(ARCHIVE_DIR, ARCHIVE_INDEX)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _archive_index_cache["key"] != key:
+        with open(path, "r") as f:
+            _archive_index_cache["data"] = json.load(f)
+        _archive_index_cache["key"] = key
+    return _archive_index_cache["data"]
+
+
+def load_archived_partition(partition):
+    try:
+        with gzip.open(_archive_partition_path(partition), "rt") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_archived_payment(payment_id):
+    """Retorna los datos de un pago archivado, o None si no está en el archivo."""
+    partition = load_archive_index().get(str(payment_id))
+    if partition is None:
+        return None
+    return load_archived_partition(partition).get(str(payment_id))
+
+
+def load_all_archived_payments():
+    all_data = {}
+    for partition in sorted(set(load_archive_index().values())):
+        all_data.update(load_archived_partition(partition))
+    return all_data
+
+
+def archive_payments(payments):
+    """
+    Agrega los pagos a sus particiones del archivo y actualiza el índice.
+    No los quita de DATA_PATH: si el proceso se interrumpe, el pago sigue disponible
+    en el archivo caliente y volver a archivarlo es idempotente.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+    by_partition = {}
+    for payment_id, data in payments.items():
+        by_partition.setdefault(archive_partition(data), {})[str(payment_id)] = data
+
+    index = dict(load_archive_index())
+    for partition, partition_payments in by_partition.items():
+        partition_data = load_archived_partition(partition)
+        partition_data.update(partition_payments)
+        _write_atomic(_archive_partition_path(partition),
+                      gzip.compress(json.dumps(partition_data).encode("utf-8")))
+        for payment_id in partition_payments:
+            index[payment_id] = partition
+
+    _write_atomic(os.path.join(ARCHIVE_DIR, ARCHIVE_INDEX), json.dumps(index).encode("utf-8"))